@@ -4,12 +4,24 @@
 """
 
 import os
-from typing import Dict, Any
+from typing import Any, Dict
 
 
 class Config:
     """配置管理类"""
 
+    __slots__ = (
+        "host",
+        "port",
+        "debug",
+        "server_key",
+        "enable_cors",
+        "allowed_origins",
+        "log_level",
+        "weather_api_base",
+        "weather_api_key",
+    )
+
     def __init__(self):
         # 服务器配置
         self.host = os.getenv("HOST", "0.0.0.0")
@@ -19,7 +31,7 @@ class Config:
         # WebSocket配置
         self.server_key = os.getenv("SERVER_KEY", "v%2BGNdYhqHQJ1drrKS6JJ3W12I2tAWMmimVUgyDHs%2FpFuup38CTerac1ML7TeIgmI")
         self.enable_cors = os.getenv("ENABLE_CORS", "true").lower() == "true"
-        self.allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
+        self.allowed_origins = tuple(os.getenv("ALLOWED_ORIGINS", "*").split(","))
         
         # 日志配置
         self.log_level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -29,7 +41,7 @@ class Config:
         self.weather_api_key = os.getenv("WEATHER_API_KEY")
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
+        """转换为字典格式（每次按当前属性值新建，可直接序列化）"""
         return {
             "host": self.host,
             "port": self.port,
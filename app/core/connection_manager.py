@@ -3,14 +3,26 @@ WebSocket连接管理器
 管理工具端和小智端的WebSocket连接，与mcp-endpoint-server保持兼容
 """
 
+import asyncio
+import itertools
 import json
-import uuid
-from typing import Dict, Optional, Set
+import re
+from typing import Dict, Optional, Set, Union
 from fastapi import WebSocket
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# 批量发送模式下，每帧最多合并的消息数与等待后续消息的最长时间（秒）
+TOOL_BATCH_MAX_SIZE = 16
+TOOL_BATCH_MAX_WAIT = 0.0005
+
+# 匹配原始帧中"id"字段的值（JSON字符串或数字），用于直接改写ID而不必重新序列化整条消息
+_ID_FIELD_RE = re.compile(
+    r'"id"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+)
+
 
 class ConnectionManager:
     """WebSocket连接管理器"""
@@ -19,128 +31,305 @@ class ConnectionManager:
         # 工具端连接: agent_id -> websocket
         self.tool_connections: Dict[str, WebSocket] = {}
         
-        # 小智端连接: connection_uuid -> (agent_id, websocket)
-        self.robot_connections: Dict[str, tuple[str, WebSocket]] = {}
+        # 小智端连接: connection_id -> (agent_id, websocket)
+        # 连接ID为进程内单调递增的整数，哈希比字符串快，转换后的JSON-RPC ID也更短
+        self._next_cid = itertools.count(1)
+        self.robot_connections: Dict[int, tuple[str, WebSocket]] = {}
         
-        # JSON-RPC ID映射: original_id -> (connection_uuid, transformed_id)
-        self.id_mapping: Dict[str, tuple[str, str]] = {}
+        # JSON-RPC ID映射: transformed_id -> (connection_id, original_id)
+        self.id_mapping: Dict[str, tuple[int, str]] = {}
 
-    async def register_tool_connection(self, agent_id: str, websocket: WebSocket) -> bool:
-        """注册工具端连接"""
-        try:
-            # 如果已存在连接，先关闭旧连接
-            if agent_id in self.tool_connections:
-                old_websocket = self.tool_connections[agent_id]
-                try:
-                    await old_websocket.close()
-                except Exception as e:
-                    logger.warning(f"关闭旧工具端连接时出错: {e}")
+        # 反向索引: connection_id -> {transformed_id}，用于断开时快速清理ID映射
+        self.cid_to_ids: Dict[int, Set[str]] = {}
+
+        # 批量发送模式的工具端: agent_id -> (发送队列, 合并写入任务)
+        self.tool_writers: Dict[str, tuple[asyncio.Queue, asyncio.Task]] = {}
+
+        # 使用二进制帧接收消息的工具端agent_id
+        self.binary_tools: Set[str] = set()
+
+        # 保护注册/注销操作，查询与转发只读字典，无需加锁
+        self._lock = asyncio.Lock()
+
+    async def register_tool_connection(
+        self, agent_id: str, websocket: WebSocket, batch: bool = False, binary: bool = False
+    ) -> bool:
+        """注册工具端连接
+
+        batch为True时，转发给该工具端的消息先进入队列，由后台任务合并为
+        以换行分隔的多条JSON（NDJSON）后一次发送，工具端需按行解析。
+        binary为True时以UTF-8二进制帧发送，已序列化为bytes的消息无需再解码/编码。
+        """
+        old_websocket = None
+        async with self._lock:
+            try:
+                # 如果已存在连接，先停止其写入任务，旧连接在释放锁后再关闭
+                old_websocket = self.tool_connections.get(agent_id)
+                if old_websocket is not None:
+                    self._stop_tool_writer(agent_id)
             
-            self.tool_connections[agent_id] = websocket
-            logger.info(f"工具端连接已注册: {agent_id}")
-            return True
-        except Exception as e:
-            logger.error(f"注册工具端连接失败: {e}")
-            return False
+                self.tool_connections[agent_id] = websocket
+                if binary:
+                    self.binary_tools.add(agent_id)
+                else:
+                    self.binary_tools.discard(agent_id)
+                if batch:
+                    queue: asyncio.Queue = asyncio.Queue()
+                    task = asyncio.create_task(
+                        self._tool_writer(agent_id, websocket, queue, binary)
+                    )
+                    self.tool_writers[agent_id] = (queue, task)
+                logger.info(
+                    f"工具端连接已注册: {agent_id} (批量发送: {batch}, 二进制帧: {binary})"
+                )
+            except Exception as e:
+                logger.error(f"注册工具端连接失败: {e}")
+                return False
 
-    async def unregister_tool_connection(self, agent_id: str) -> bool:
-        """注销工具端连接"""
-        try:
-            if agent_id in self.tool_connections:
-                del self.tool_connections[agent_id]
-                logger.info(f"工具端连接已注销: {agent_id}")
-                return True
-            return False
-        except Exception as e:
-            logger.error(f"注销工具端连接失败: {e}")
-            return False
+        # 关闭旧连接可能较慢，不在锁内等待，避免阻塞其他连接的注册与注销
+        if old_websocket is not None and old_websocket is not websocket:
+            try:
+                await old_websocket.close()
+            except Exception as e:
+                logger.warning(f"关闭旧工具端连接时出错: {e}")
+        return True
 
-    async def register_robot_connection(self, agent_id: str, websocket: WebSocket) -> str:
-        """注册小智端连接并返回UUID"""
-        try:
-            connection_uuid = str(uuid.uuid4())
-            self.robot_connections[connection_uuid] = (agent_id, websocket)
-            logger.info(f"小智端连接已注册: {agent_id} (UUID: {connection_uuid})")
-            return connection_uuid
-        except Exception as e:
-            logger.error(f"注册小智端连接失败: {e}")
-            return ""
+    async def unregister_tool_connection(
+        self, agent_id: str, websocket: Optional[WebSocket] = None
+    ) -> bool:
+        """注销工具端连接
 
-    async def unregister_robot_connection(self, connection_uuid: str) -> bool:
+        传入websocket时仅当其仍是当前注册的连接才注销，避免被替换的旧连接
+        在退出时误删新连接。
+        """
+        async with self._lock:
+            try:
+                if websocket is not None and self.tool_connections.get(agent_id) is not websocket:
+                    return False
+                if agent_id in self.tool_connections:
+                    del self.tool_connections[agent_id]
+                    self.binary_tools.discard(agent_id)
+                    self._stop_tool_writer(agent_id)
+                    logger.info(f"工具端连接已注销: {agent_id}")
+                    return True
+                return False
+            except Exception as e:
+                logger.error(f"注销工具端连接失败: {e}")
+                return False
+
+    async def register_robot_connection(self, agent_id: str, websocket: WebSocket) -> int:
+        """注册小智端连接并返回连接ID（注册失败返回0）"""
+        async with self._lock:
+            try:
+                connection_id = next(self._next_cid)
+                self.robot_connections[connection_id] = (agent_id, websocket)
+                logger.info(f"小智端连接已注册: {agent_id} (ID: {connection_id})")
+                return connection_id
+            except Exception as e:
+                logger.error(f"注册小智端连接失败: {e}")
+                return 0
+
+    async def unregister_robot_connection(self, connection_id: int) -> bool:
         """注销小智端连接"""
-        try:
-            if connection_uuid in self.robot_connections:
-                agent_id, _ = self.robot_connections[connection_uuid]
-                del self.robot_connections[connection_uuid]
+        async with self._lock:
+            try:
+                if connection_id in self.robot_connections:
+                    agent_id, _ = self.robot_connections[connection_id]
+                    del self.robot_connections[connection_id]
                 
-                # 清理相关的ID映射
-                self._cleanup_id_mapping(connection_uuid)
+                    # 清理相关的ID映射
+                    self._cleanup_id_mapping(connection_id)
                 
-                logger.info(f"小智端连接已注销: {agent_id} (UUID: {connection_uuid})")
-                return True
-            return False
-        except Exception as e:
-            logger.error(f"注销小智端连接失败: {e}")
-            return False
+                    logger.info(f"小智端连接已注销: {agent_id} (ID: {connection_id})")
+                    return True
+                return False
+            except Exception as e:
+                logger.error(f"注销小智端连接失败: {e}")
+                return False
 
     def is_tool_connected(self, agent_id: str) -> bool:
         """检查工具端是否已连接"""
         return agent_id in self.tool_connections
 
-    async def forward_to_tool(self, agent_id: str, message: str) -> bool:
-        """转发消息给工具端"""
+    async def forward_to_tool(self, agent_id: str, message: Union[str, bytes]) -> bool:
+        """转发消息给工具端
+
+        message可为str或UTF-8 bytes，按工具端注册的帧类型转换后发送。
+        批量发送模式下消息连同一个Future入队，等待写入任务发送后返回实际结果，
+        调用方据此向小智端返回转发失败错误。
+        """
         try:
             if agent_id not in self.tool_connections:
                 logger.warning(f"工具端未连接: {agent_id}")
                 return False
+
+            writer = self.tool_writers.get(agent_id)
+            if writer is not None:
+                sent = asyncio.get_running_loop().create_future()
+                writer[0].put_nowait((message, sent))
+                return await sent
             
             websocket = self.tool_connections[agent_id]
-            await websocket.send_text(message)
-            logger.debug(f"消息已转发给工具端: {agent_id}")
+            if agent_id in self.binary_tools:
+                await websocket.send_bytes(
+                    message if isinstance(message, bytes) else message.encode()
+                )
+            else:
+                await websocket.send_text(
+                    message if isinstance(message, str) else message.decode()
+                )
+            logger.debug("消息已转发给工具端: %s", agent_id)
             return True
         except Exception as e:
             logger.error(f"转发消息给工具端失败: {e}")
             return False
 
-    async def forward_to_robot_by_uuid(self, connection_uuid: str, message: str) -> bool:
-        """根据UUID转发消息给小智端"""
+    async def forward_to_robot_by_uuid(
+        self, connection_id: int, message: Union[str, bytes]
+    ) -> bool:
+        """根据连接ID转发消息给小智端（始终以文本帧发送）"""
         try:
-            if connection_uuid not in self.robot_connections:
-                logger.warning(f"小智端连接不存在: {connection_uuid}")
+            if connection_id not in self.robot_connections:
+                logger.warning(f"小智端连接不存在: {connection_id}")
                 return False
             
-            _, websocket = self.robot_connections[connection_uuid]
-            await websocket.send_text(message)
-            logger.debug(f"消息已转发给小智端: {connection_uuid}")
+            _, websocket = self.robot_connections[connection_id]
+            await websocket.send_text(
+                message if isinstance(message, str) else message.decode()
+            )
+            logger.debug("消息已转发给小智端: %s", connection_id)
             return True
         except Exception as e:
             logger.error(f"转发消息给小智端失败: {e}")
             return False
 
-    def transform_jsonrpc_message(self, message_data: dict, connection_uuid: str) -> dict:
-        """转换JSON-RPC消息ID以支持多连接"""
+    async def _tool_writer(
+        self, agent_id: str, websocket: WebSocket, queue: asyncio.Queue, binary: bool = False
+    ):
+        """合并队列中的消息并批量发送给工具端
+
+        队列元素为(消息, Future)，发送成功后Future置为True。写入任务因异常或被取消
+        而退出时，当前批次与队列中剩余的消息全部置为False，由转发方返回错误。
+        """
+        batch: list = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                self._drain_into(queue, batch)
+                if len(batch) < TOOL_BATCH_MAX_SIZE:
+                    # 每批只等待一次合并窗口，之后一次性取走期间到达的消息
+                    await asyncio.sleep(TOOL_BATCH_MAX_WAIT)
+                    self._drain_into(queue, batch)
+
+                if binary:
+                    await websocket.send_bytes(b"\n".join(
+                        m if isinstance(m, bytes) else m.encode() for m, _ in batch
+                    ))
+                else:
+                    await websocket.send_text("\n".join(
+                        m if isinstance(m, str) else m.decode() for m, _ in batch
+                    ))
+                self._resolve_batch(batch, True)
+                logger.debug("已批量转发 %s 条消息给工具端: %s", len(batch), agent_id)
+                batch = []
+        except asyncio.CancelledError:
+            self._resolve_batch(batch, False)
+            self._fail_queued(queue)
+        except Exception as e:
+            logger.error(f"批量转发消息给工具端失败: {e}")
+            # 写入任务退出后回退为直接发送，避免后续消息滞留在队列中
+            writer = self.tool_writers.get(agent_id)
+            if writer is not None and writer[0] is queue:
+                del self.tool_writers[agent_id]
+            self._resolve_batch(batch, False)
+            self._fail_queued(queue)
+
+    @staticmethod
+    def _drain_into(queue: asyncio.Queue, batch: list):
+        """不等待地从队列取出消息追加到batch，直到队列为空或达到批量上限"""
+        while len(batch) < TOOL_BATCH_MAX_SIZE:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+    @staticmethod
+    def _resolve_batch(batch: list, sent: bool):
+        """设置一批消息的发送结果（已被取消的Future跳过）"""
+        for _, future in batch:
+            if not future.done():
+                future.set_result(sent)
+
+    def _fail_queued(self, queue: asyncio.Queue):
+        """将队列中尚未发送的消息全部标记为发送失败"""
+        failed = []
+        while True:
+            try:
+                failed.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        if failed:
+            self._resolve_batch(failed, False)
+            logger.warning("工具端写入任务已退出，%s 条消息未发送", len(failed))
+
+    def _stop_tool_writer(self, agent_id: str):
+        """停止工具端的批量写入任务
+
+        写入任务可能尚未开始运行，因此在此同步清空队列，保证等待中的转发方都能拿到结果。
+        """
+        writer = self.tool_writers.pop(agent_id, None)
+        if writer is not None:
+            writer[1].cancel()
+            self._fail_queued(writer[0])
+
+    def transform_jsonrpc_message(self, message_data: dict, connection_id: int) -> dict:
+        """转换JSON-RPC消息ID以支持多连接（原地修改message_data）"""
         try:
             if "id" not in message_data or message_data["id"] is None:
                 return message_data
             
             original_id = str(message_data["id"])
-            transformed_id = f"{connection_uuid}:{original_id}"
+            transformed_id = f"{connection_id}:{original_id}"
             
             # 保存ID映射
-            self.id_mapping[transformed_id] = (connection_uuid, original_id)
+            self.id_mapping[transformed_id] = (connection_id, original_id)
+            self.cid_to_ids.setdefault(connection_id, set()).add(transformed_id)
             
-            # 创建新的消息数据
-            transformed_message = message_data.copy()
-            transformed_message["id"] = transformed_id
+            # 原地替换ID，调用方转发后即丢弃原消息，无需复制
+            message_data["id"] = transformed_id
             
-            logger.debug(f"JSON-RPC ID已转换: {original_id} -> {transformed_id}")
-            return transformed_message
+            logger.debug("JSON-RPC ID已转换: %s -> %s", original_id, transformed_id)
+            return message_data
         except Exception as e:
             logger.error(f"转换JSON-RPC消息失败: {e}")
             return message_data
 
-    def restore_jsonrpc_message(self, message_data: dict) -> tuple[Optional[str], dict]:
-        """还原JSON-RPC消息ID并获取目标连接UUID"""
+    def patch_jsonrpc_id(
+        self, raw_message: str, original_id, transformed_id: str
+    ) -> Optional[str]:
+        """在原始帧上直接把ID替换为transformed_id
+
+        仅当帧中只出现一次"id"且其值与original_id一致时才改写，否则返回None，
+        调用方应回退为序列化转换后的消息。
+        """
+        if raw_message.count('"id"') != 1:
+            return None
+        match = _ID_FIELD_RE.search(raw_message)
+        if match is None:
+            return None
+        try:
+            if orjson.loads(match.group(1)) != original_id:
+                return None
+        except orjson.JSONDecodeError:
+            return None
+        return (
+            raw_message[:match.start(1)]
+            + orjson.dumps(transformed_id).decode()
+            + raw_message[match.end(1):]
+        )
+
+    def restore_jsonrpc_message(self, message_data: dict) -> tuple[Optional[int], dict]:
+        """还原JSON-RPC消息ID并获取目标连接ID（原地修改message_data）"""
         try:
             if "id" not in message_data or message_data["id"] is None:
                 return None, message_data
@@ -151,34 +340,32 @@ class ConnectionManager:
                 logger.warning(f"未找到ID映射: {transformed_id}")
                 return None, message_data
             
-            connection_uuid, original_id = self.id_mapping[transformed_id]
+            connection_id, original_id = self.id_mapping[transformed_id]
             
-            # 创建还原的消息数据
-            restored_message = message_data.copy()
-            restored_message["id"] = original_id
+            # 原地还原ID
+            message_data["id"] = original_id
             
             # 清理ID映射
             del self.id_mapping[transformed_id]
+            ids = self.cid_to_ids.get(connection_id)
+            if ids is not None:
+                ids.discard(transformed_id)
             
-            logger.debug(f"JSON-RPC ID已还原: {transformed_id} -> {original_id}")
-            return connection_uuid, restored_message
+            logger.debug("JSON-RPC ID已还原: %s -> %s", transformed_id, original_id)
+            return connection_id, message_data
         except Exception as e:
             logger.error(f"还原JSON-RPC消息失败: {e}")
             return None, message_data
 
-    def _cleanup_id_mapping(self, connection_uuid: str):
+    def _cleanup_id_mapping(self, connection_id: int):
         """清理指定连接的ID映射"""
         try:
-            keys_to_remove = []
-            for transformed_id, (uuid, _) in self.id_mapping.items():
-                if uuid == connection_uuid:
-                    keys_to_remove.append(transformed_id)
-            
-            for key in keys_to_remove:
-                del self.id_mapping[key]
-            
-            if keys_to_remove:
-                logger.debug(f"已清理 {len(keys_to_remove)} 个ID映射: {connection_uuid}")
+            transformed_ids = self.cid_to_ids.pop(connection_id, ())
+            for transformed_id in transformed_ids:
+                self.id_mapping.pop(transformed_id, None)
+
+            if transformed_ids:
+                logger.debug("已清理 %s 个ID映射: %s", len(transformed_ids), connection_id)
         except Exception as e:
             logger.error(f"清理ID映射失败: {e}")
 
@@ -3,10 +3,12 @@ WebSocket处理器
 处理工具端和小智端的WebSocket连接，与mcp-endpoint-server保持兼容
 """
 
-import json
 import logging
 import asyncio
-from typing import Optional, Union
+from typing import Awaitable, Callable, Optional
+
+import orjson
+from fastmcp.server.context import Context
 from core.connection_manager import connection_manager
 from utils.jsonrpc import (
     JSONRPCProtocol,
@@ -14,199 +16,217 @@ from utils.jsonrpc import (
     create_forward_failed_error,
 )
 
-# 自定义JSON编码器来处理TextContent对象
-class MCPJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if hasattr(obj, 'model_dump'):
-            return obj.model_dump()
-        elif hasattr(obj, 'to_dict'):
-            return obj.to_dict()
-        return super().default(obj)
+# 按类型缓存的序列化函数: type -> model_dump/to_dict（无法序列化的类型为None）
+_ENCODERS: dict = {}
+
+
+# orjson的default回调，用于处理TextContent等对象
+def _mcp_default(obj):
+    obj_type = type(obj)
+    try:
+        encoder = _ENCODERS[obj_type]
+    except KeyError:
+        encoder = getattr(obj_type, 'model_dump', None) or getattr(obj_type, 'to_dict', None)
+        _ENCODERS[obj_type] = encoder
+    if encoder is None:
+        raise TypeError(f"Type is not JSON serializable: {obj_type.__name__}")
+    return encoder(obj)
+
+
+# 工具返回的dict可能含非字符串键，与json.dumps一样将其转为字符串
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps_message(obj) -> str:
+    """使用orjson序列化为JSON字符串（非ASCII字符不转义）"""
+    return orjson.dumps(obj, default=_mcp_default, option=_DUMPS_OPTIONS).decode()
+
 
 logger = logging.getLogger(__name__)
 
+# Python 3.11+提供asyncio.timeout，旧版本回退为asyncio.wait_for
+_asyncio_timeout = getattr(asyncio, "timeout", None)
+
+# 成功响应的固定外壳，拼接id与已序列化的result即得完整响应
+_ENV_PREFIX = b'{"jsonrpc":"2.0","id":'
+_ENV_MID = b',"result":'
+_ENV_END = b'}'
+
+
+def _result_envelope(request_id, result: bytes) -> orjson.Fragment:
+    """将已序列化的result包装为JSON-RPC成功响应，免去外层dict的构建与序列化"""
+    return orjson.Fragment(
+        _ENV_PREFIX + orjson.dumps(request_id) + _ENV_MID + result + _ENV_END
+    )
+
+
+# initialize的结果固定不变，导入时序列化一次
+_INIT_RESULT = orjson.dumps({
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "roots": {
+            "listChanged": False
+        },
+        "sampling": {}
+    },
+    "serverInfo": {
+        "name": "fastmcp-api-server",
+        "version": "1.0.0"
+    }
+})
+
+# 工具未声明参数时使用的inputSchema，仅用于序列化，各工具共享同一对象
+_DEFAULT_INPUT_SCHEMA = {
+    "type": "object",
+    "properties": {},
+    "required": []
+}
+
+# 预编码的错误响应片段: (code, message) -> ',"error":{"code":...,"message":...'
+_ERROR_HEADS = {
+    (code, message): b',"error":{"code":' + orjson.dumps(code) + b',"message":' + orjson.dumps(message)
+    for code, message in (
+        (-32601, "Method not found"),
+        (-32602, "Invalid params"),
+        (-32603, "Internal error"),
+    )
+}
+_ERR_DATA = b',"data":'
+_ERR_END = b'}}'
+
+# 超时错误响应中id之后的固定部分
+_TIMEOUT_ERROR = orjson.dumps({
+    "code": -32603,
+    "message": "Internal error",
+    "data": {"detail": "Request timeout after 10 seconds"}
+})
+
+
+def create_timeout_response(request_id) -> orjson.Fragment:
+    """创建MCP请求处理超时的JSON-RPC错误响应"""
+    return orjson.Fragment(
+        _ENV_PREFIX + orjson.dumps(request_id) + b',"error":' + _TIMEOUT_ERROR + b'}'
+    )
+
+
+# 由服务器直接处理的MCP协议方法
+_MCP_METHODS = frozenset({
+    "tools/list",
+    "tools/call",
+    "resources/list",
+    "resources/read",
+    "prompts/list",
+    "prompts/get",
+    "initialize",
+    "notifications/initialized",
+})
+
 
 class WebSocketHandler:
     """WebSocket处理器"""
 
     def __init__(self, mcp_server=None):
         self.mcp_server = mcp_server
+        # 预序列化的tools/list结果: (生成时的工具快照, result字节)
+        # 每次请求仍调用_list_tools()，启用状态、挂载服务器与中间件的变化都会体现在快照中，
+        # 快照一致时仅复用序列化结果
+        self._tools_list_cache: Optional[tuple[list, bytes]] = None
+
+        # MCP方法 -> 处理函数，未列出的方法返回Method not found
+        self._mcp_handlers = {
+            "initialize": self._mcp_initialize,
+            "notifications/initialized": self._mcp_initialized,
+            "tools/list": self._mcp_tools_list,
+            "tools/call": self._mcp_tools_call,
+        }
 
     async def _handle_tool_message(self, agent_id: str, message: str, websocket=None):
         """处理工具端消息"""
         try:
             # 解析消息
-            logger.info(f"收到工具端消息: {agent_id} - {message}")
+            logger.debug("收到工具端消息: %s - %s", agent_id, message)
+
+            # 无ID的通知既不需要MCP响应，也无法还原目标连接，跳过解析直接忽略
+            if '"id"' not in message:
+                logger.debug("忽略工具端通知消息: %s", agent_id)
+                return
 
             # 尝试解析JSON-RPC消息
             try:
-                message_data = json.loads(message)
+                message_data = orjson.loads(message)
                 
                 # 检查是否是MCP协议请求
-                logger.info(f"检查MCP请求: method={message_data.get('method')}, jsonrpc={message_data.get('jsonrpc')}")
                 is_mcp = self._is_mcp_request(message_data)
-                logger.info(f"MCP请求检查结果: {is_mcp}")
+                logger.debug("MCP请求检查结果: %s", is_mcp)
                 
                 if is_mcp:
-                    logger.info("检测到MCP协议请求，直接处理")
-                    # 直接处理MCP协议请求，添加10秒超时
-                    try:
-                        response = await asyncio.wait_for(
-                            self._handle_mcp_request(message_data), 
-                            timeout=10.0
-                        )
-                        if response:
-                            logger.info(f"发送MCP响应: {response}")
-                            # 如果有WebSocket连接，直接发送响应
-                            if websocket:
-                                await websocket.send_text(json.dumps(response, ensure_ascii=False, cls=MCPJSONEncoder))
-                            else:
-                                # 否则通过连接管理器转发（保持向后兼容）
-                                await connection_manager.forward_to_tool(
-                                    agent_id, json.dumps(response, ensure_ascii=False, cls=MCPJSONEncoder)
-                                )
-                    except asyncio.TimeoutError:
-                        logger.error("MCP请求处理超时（10秒）")
-                        # 发送超时错误响应
-                        timeout_response = {
-                            "jsonrpc": "2.0",
-                            "id": message_data.get("id"),
-                            "error": {
-                                "code": -32603,
-                                "message": "Internal error",
-                                "data": {"detail": "Request timeout after 10 seconds"}
-                            }
-                        }
-                        if websocket:
-                            await websocket.send_text(json.dumps(timeout_response, ensure_ascii=False))
-                        else:
-                            await connection_manager.forward_to_tool(
-                                agent_id, json.dumps(timeout_response, ensure_ascii=False)
-                            )
+                    # 直接处理MCP协议请求，响应按工具端注册的帧类型与批量模式发送
+                    await self._dispatch_mcp(
+                        message_data,
+                        lambda text: self._send_to_tool(agent_id, websocket, text),
+                    )
                     return
                 
-                # 还原JSON-RPC ID并获取目标连接UUID
-                connection_uuid, restored_message = (
+                # 还原JSON-RPC ID并获取目标连接ID
+                connection_id, restored_message = (
                     connection_manager.restore_jsonrpc_message(message_data)
                 )
 
-                if connection_uuid:
+                if connection_id:
                     # 有特定的目标连接，发送给该连接
                     success = await connection_manager.forward_to_robot_by_uuid(
-                        connection_uuid, json.dumps(restored_message, ensure_ascii=False)
+                        connection_id, dumps_message(restored_message)
                     )
                     if not success:
-                        logger.error(f"转发消息给特定小智端连接失败: {connection_uuid}")
+                        logger.error(f"转发消息给特定小智端连接失败: {connection_id}")
                 else:
                     logger.error(f"没有特定目标，无法转发消息")
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 # 如果不是JSON格式，按原来的方式处理
                 logger.error(f"由于消息不是JSON格式，已忽略: {message}")
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"工具端消息格式错误: {message}")
         except Exception as e:
             logger.error(f"处理工具端消息时发生错误: {e}")
 
     async def _handle_robot_message(
-        self, agent_id: str, message: str, connection_uuid: str, websocket=None
+        self, agent_id: str, message: str, connection_id: int, websocket=None
     ):
         """处理小智端消息 - 支持直接MCP协议处理"""
         try:
             # 解析消息
-            logger.info(f"收到小智端消息: {agent_id} (UUID: {connection_uuid}) - {message}")
+            logger.debug("收到小智端消息: %s (ID: %s) - %s", agent_id, connection_id, message)
 
             # 尝试解析JSON-RPC消息
             try:
-                message_data = json.loads(message)
+                message_data = orjson.loads(message)
+
+                # JSON-RPC批量请求
+                if isinstance(message_data, list):
+                    await self._handle_robot_batch(
+                        agent_id, message_data, connection_id, websocket
+                    )
+                    return
                 
                 # 检查是否是MCP协议请求
-                logger.info(f"检查MCP请求: method={message_data.get('method')}, jsonrpc={message_data.get('jsonrpc')}")
                 is_mcp = self._is_mcp_request(message_data)
-                logger.info(f"MCP请求检查结果: {is_mcp}")
+                logger.debug("MCP请求检查结果: %s", is_mcp)
                 
                 if is_mcp:
-                    logger.info("检测到MCP协议请求，直接处理")
-                    # 直接处理MCP协议请求，添加10秒超时
-                    try:
-                        response = await asyncio.wait_for(
-                            self._handle_mcp_request(message_data), 
-                            timeout=10.0
-                        )
-                        if response:
-                            logger.info(f"发送MCP响应: {response}")
-                            # 如果有WebSocket连接，直接发送响应
-                            if websocket:
-                                await websocket.send_text(json.dumps(response, ensure_ascii=False, cls=MCPJSONEncoder))
-                            else:
-                                # 否则通过连接管理器转发
-                                await connection_manager.forward_to_robot_by_uuid(
-                                    connection_uuid, json.dumps(response, ensure_ascii=False, cls=MCPJSONEncoder)
-                                )
-                    except asyncio.TimeoutError:
-                        logger.error("MCP请求处理超时（10秒）")
-                        # 发送超时错误响应
-                        timeout_response = {
-                            "jsonrpc": "2.0",
-                            "id": message_data.get("id"),
-                            "error": {
-                                "code": -32603,
-                                "message": "Internal error",
-                                "data": {"detail": "Request timeout after 10 seconds"}
-                            }
-                        }
-                        if websocket:
-                            await websocket.send_text(json.dumps(timeout_response, ensure_ascii=False))
-                        else:
-                            await connection_manager.forward_to_robot_by_uuid(
-                                connection_uuid, json.dumps(timeout_response, ensure_ascii=False)
-                            )
+                    # 直接处理MCP协议请求
+                    await self._dispatch_mcp(
+                        message_data,
+                        lambda text: self._send_to_robot(connection_id, websocket, text),
+                    )
                     return
 
                 # 如果不是MCP请求，按原来的方式处理（转发给工具端）
-                request_id = message_data.get("id")
-                
-                # 转换JSON-RPC ID
-                transformed_message_data = connection_manager.transform_jsonrpc_message(
-                    message_data, connection_uuid
-                )
-                transformed_message = json.dumps(
-                    transformed_message_data, ensure_ascii=False
+                await self._forward_robot_request(
+                    agent_id, message_data, connection_id, websocket, message
                 )
 
-                logger.debug(
-                    f"转换后的消息ID: {message_data.get('id')} -> {transformed_message_data.get('id')}"
-                )
-
-                # 检查是否有对应的工具端连接
-                if not connection_manager.is_tool_connected(agent_id):
-                    logger.warning(f"工具端未连接: {agent_id}")
-                    # 发送JSON-RPC格式的错误消息给小智端
-                    error_message = create_tool_not_connected_error(request_id, agent_id)
-                    if websocket:
-                        await websocket.send_text(error_message)
-                    else:
-                        await connection_manager.forward_to_robot_by_uuid(
-                            connection_uuid, error_message
-                        )
-                    return
-
-                # 转发转换后的消息给工具端
-                success = await connection_manager.forward_to_tool(
-                    agent_id, transformed_message
-                )
-                if not success:
-                    logger.error(f"转发消息给工具端失败: {agent_id}")
-                    # 发送JSON-RPC格式的错误消息给小智端
-                    error_message = create_forward_failed_error(request_id, agent_id)
-                    if websocket:
-                        await websocket.send_text(error_message)
-                    else:
-                        await connection_manager.forward_to_robot_by_uuid(
-                            connection_uuid, error_message
-                        )
-
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.warning(f"小智端消息不是有效的JSON格式: {message}")
                 # 如果消息不是JSON格式，仍然检查工具端连接状态
                 if not connection_manager.is_tool_connected(agent_id):
@@ -216,208 +236,318 @@ class WebSocketHandler:
                         await websocket.send_text(error_message)
                     else:
                         await connection_manager.forward_to_robot_by_uuid(
-                            connection_uuid, error_message
+                            connection_id, error_message
                         )
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"小智端消息格式错误: {message}")
         except Exception as e:
             logger.error(f"处理小智端消息时发生错误: {e}")
 
+    async def _handle_robot_batch(
+        self, agent_id: str, batch: list, connection_id: int, websocket=None
+    ):
+        """处理小智端的JSON-RPC批量请求
+
+        MCP请求并发处理，响应合并为一个数组帧返回；其余请求逐条转发给工具端，
+        工具端的响应仍按单条消息返回。
+        """
+        if not batch:
+            await self._send_to_robot(
+                connection_id, websocket,
+                dumps_message(self._create_error_response(None, -32600, "Invalid Request")),
+            )
+            return
+
+        mcp_requests = []
+        for item in batch:
+            if self._is_mcp_request(item):
+                mcp_requests.append(item)
+            elif isinstance(item, dict):
+                await self._forward_robot_request(agent_id, item, connection_id, websocket)
+            else:
+                mcp_requests.append(item)
+
+        if not mcp_requests:
+            return
+
+        responses = await asyncio.gather(
+            *(self._handle_batch_item(item) for item in mcp_requests)
+        )
+        responses = [r for r in responses if r is not None]
+        if responses:
+            await self._send_to_robot(connection_id, websocket, dumps_message(responses))
+
+    async def _handle_batch_item(self, item) -> Optional[orjson.Fragment]:
+        """处理批量请求中的单条MCP请求，非法条目返回Invalid Request错误"""
+        if not isinstance(item, dict):
+            return self._create_error_response(None, -32600, "Invalid Request")
+        return await self._run_mcp_request(item)
+
+    async def _run_mcp_request(self, message_data: dict) -> Optional[orjson.Fragment]:
+        """处理MCP请求，添加10秒超时，超时则返回超时错误响应"""
+        if message_data.get("method") == "notifications/initialized" and "id" not in message_data:
+            # 初始化完成通知无需响应，不必进入超时计时与方法分发
+            logger.debug("收到MCP初始化完成通知，不返回响应")
+            return None
+        try:
+            if _asyncio_timeout is not None:
+                # 在当前任务内计时，无需像wait_for那样额外创建任务
+                async with _asyncio_timeout(10.0):
+                    return await self._handle_mcp_request(message_data)
+            return await asyncio.wait_for(
+                self._handle_mcp_request(message_data), timeout=10.0
+            )
+        except asyncio.TimeoutError:
+            logger.error("MCP请求处理超时（10秒）")
+            return create_timeout_response(message_data.get("id"))
+
+    async def _dispatch_mcp(self, message_data: dict, send: Callable[[str], Awaitable]):
+        """处理MCP请求并通过send回调发送响应（通知类请求无响应）"""
+        response = await self._run_mcp_request(message_data)
+        if response is not None:
+            # 先序列化再记录日志，Fragment本身只会打印为对象地址
+            text = dumps_message(response)
+            logger.debug("发送MCP响应: %s", text)
+            await send(text)
+
+    async def _forward_robot_request(
+        self,
+        agent_id: str,
+        message_data: dict,
+        connection_id: int,
+        websocket=None,
+        raw_message: Optional[str] = None,
+    ):
+        """转换ID后将小智端请求转发给工具端，失败时向小智端返回错误
+
+        raw_message为原始帧：通知消息直接转发，带ID的请求尽量在原始帧上改写ID。
+        """
+        request_id = message_data.get("id")
+
+        # 批量发送模式以换行分隔消息，含换行（格式化输出）的原始帧会破坏分帧，改为紧凑序列化
+        if (
+            raw_message is not None
+            and "\n" in raw_message
+            and agent_id in connection_manager.tool_writers
+        ):
+            raw_message = None
+
+        if request_id is None and raw_message is not None:
+            # 通知消息无需转换ID，原样转发原始帧
+            transformed_message = raw_message
+        elif request_id is None:
+            transformed_message = orjson.dumps(message_data)
+        else:
+            # 转换JSON-RPC ID
+            transformed_message_data = connection_manager.transform_jsonrpc_message(
+                message_data, connection_id
+            )
+            # 优先在原始帧上改写ID，避免整条消息再序列化一次
+            transformed_message = None
+            if raw_message is not None:
+                transformed_message = connection_manager.patch_jsonrpc_id(
+                    raw_message, request_id, transformed_message_data["id"]
+                )
+            if transformed_message is None:
+                # 直接交出orjson的bytes，由连接管理器按工具端帧类型发送
+                transformed_message = orjson.dumps(transformed_message_data)
+
+            logger.debug(
+                "转换后的消息ID: %s -> %s", request_id, transformed_message_data.get("id")
+            )
+
+        # 检查是否有对应的工具端连接
+        if not connection_manager.is_tool_connected(agent_id):
+            logger.warning(f"工具端未连接: {agent_id}")
+            # 发送JSON-RPC格式的错误消息给小智端
+            await self._send_to_robot(
+                connection_id, websocket,
+                create_tool_not_connected_error(request_id, agent_id),
+            )
+            return
+
+        # 转发转换后的消息给工具端
+        success = await connection_manager.forward_to_tool(agent_id, transformed_message)
+        if not success:
+            logger.error(f"转发消息给工具端失败: {agent_id}")
+            # 发送JSON-RPC格式的错误消息给小智端
+            await self._send_to_robot(
+                connection_id, websocket,
+                create_forward_failed_error(request_id, agent_id),
+            )
+
+    async def _send_to_tool(self, agent_id: str, websocket, message: str):
+        """发送消息给工具端
+
+        websocket为当前注册的连接（或未提供）时经连接管理器发送，以遵循二进制帧与
+        批量发送设置，并与批量队列中的消息保持顺序；已被替换的旧连接直接以文本帧发送。
+        """
+        if websocket is None or connection_manager.tool_connections.get(agent_id) is websocket:
+            await connection_manager.forward_to_tool(agent_id, message)
+        else:
+            await websocket.send_text(message)
+
+    async def _send_to_robot(self, connection_id: int, websocket, message: str):
+        """发送消息给小智端，有WebSocket连接时直接发送，否则通过连接管理器转发"""
+        if websocket:
+            await websocket.send_text(message)
+        else:
+            await connection_manager.forward_to_robot_by_uuid(connection_id, message)
+
     def _is_mcp_request(self, message_data: dict) -> bool:
         """检查是否是MCP协议请求"""
-        logger.info(f"检查MCP请求详情: {message_data}")
-        
-        if not isinstance(message_data, dict):
-            logger.info("不是字典类型")
-            return False
-        
-        # 检查JSON-RPC格式
-        jsonrpc = message_data.get("jsonrpc")
-        if jsonrpc != "2.0":
-            logger.info(f"JSON-RPC版本不匹配: {jsonrpc}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("检查MCP请求详情: %s", message_data)
+
+        if not isinstance(message_data, dict) or message_data.get("jsonrpc") != "2.0":
             return False
-        
+
         method = message_data.get("method")
-        if not method:
-            logger.info("没有method字段")
-            return False
-        
-        # 检查是否是MCP协议方法
-        mcp_methods = [
-            "tools/list",
-            "tools/call", 
-            "resources/list",
-            "resources/read",
-            "prompts/list",
-            "prompts/get",
-            "initialize",
-            "notifications/initialized"
-        ]
-        
-        is_mcp_method = method in mcp_methods
-        logger.info(f"方法 {method} 是MCP方法: {is_mcp_method}")
-        return is_mcp_method
+        return isinstance(method, str) and method in _MCP_METHODS
 
-    async def _handle_mcp_request(self, message_data: dict) -> Optional[dict]:
-        """处理MCP协议请求 - 符合MCP 2024-11-05协议标准"""
+    async def _handle_mcp_request(self, message_data: dict) -> Optional[orjson.Fragment]:
+        """处理MCP协议请求 - 符合MCP 2024-11-05协议标准
+
+        成功响应与错误响应均为已序列化的orjson.Fragment，可直接交给dumps_message。
+        """
+        request_id = message_data.get("id")
         if not self.mcp_server:
             logger.error("MCP服务器未初始化")
             return self._create_error_response(
-                message_data.get("id"), -32603, "Internal error", "MCP服务器未初始化"
+                request_id, -32603, "Internal error", "MCP服务器未初始化"
             )
         
         try:
             method = message_data.get("method")
-            request_id = message_data.get("id")
-            params = message_data.get("params", {})
-            
-            logger.info(f"处理MCP请求: {method}, ID: {request_id}")
-            
-            if method == "initialize":
-                # MCP协议初始化响应 - 符合标准格式
-                logger.info("处理MCP初始化请求")
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "protocolVersion": "2024-11-05",
-                        "capabilities": {
-                            "roots": {
-                                "listChanged": False
-                            },
-                            "sampling": {}
-                        },
-                        "serverInfo": {
-                            "name": "fastmcp-api-server",
-                            "version": "1.0.0"
-                        }
-                    }
-                }
+            # params为null时同样按空参数处理
+            params = message_data.get("params") or {}
             
-            elif method == "notifications/initialized":
-                # 初始化完成通知，不需要返回响应
-                logger.info("收到MCP初始化完成通知，不返回响应")
-                return None
-            
-            elif method == "tools/list":
-                # 获取工具列表 - 返回标准MCP工具格式
-                logger.info("开始获取工具列表...")
-                try:
-                    tools = await self.mcp_server._list_tools()
-                    logger.info(f"获取到 {len(tools)} 个工具")
-                    
-                    mcp_tools = []
-                    for tool in tools:
-                        # 转换为标准MCP工具格式
-                        mcp_tool = {
-                            "name": tool.name,
-                            "description": tool.description or f"工具: {tool.name}",
-                            "inputSchema": tool.parameters or {
-                                "type": "object",
-                                "properties": {},
-                                "required": []
-                            }
-                        }
-                        mcp_tools.append(mcp_tool)
-                        logger.info(f"工具: {tool.name} - {tool.description}")
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "result": {
-                            "tools": mcp_tools
-                        }
-                    }
-                except Exception as e:
-                    logger.error(f"获取工具列表失败: {e}")
-                    return self._create_error_response(
-                        request_id, -32603, "Internal error", f"获取工具列表失败: {str(e)}"
-                    )
-            
-            elif method == "tools/call":
-                # 调用工具 - 支持标准MCP参数格式
-                logger.info(f"处理工具调用请求: {method}")
-                tool_name = params.get("name")
-                arguments = params.get("arguments", {})
-                logger.info(f"工具名称: {tool_name}, 参数: {arguments}")
-                
-                if not tool_name:
-                    return self._create_error_response(
-                        request_id, -32602, "Invalid params", "Missing tool name"
-                    )
-                
-                try:
-                    # 创建并设置上下文
-                    from fastmcp.server.context import Context
-                    context = Context(self.mcp_server)
-                    
-                    async with context:
-                        result = await self.mcp_server._call_tool(tool_name, arguments)
-                        mcp_result = result.to_mcp_result()
-                    
-                    # 处理MCP结果格式 - 符合标准
-                    if isinstance(mcp_result, tuple):
-                        content, structured_content = mcp_result
-                        # 将ContentBlock对象转换为可序列化的格式
-                        serializable_content = []
-                        if content:
-                            for item in content:
-                                if hasattr(item, 'model_dump'):
-                                    serializable_content.append(item.model_dump())
-                                elif hasattr(item, 'to_dict'):
-                                    serializable_content.append(item.to_dict())
-                                else:
-                                    serializable_content.append(item)
-                        response_result = {"content": serializable_content}
-                        if structured_content:
-                            response_result["structuredContent"] = structured_content
-                    else:
-                        # 处理单个结果
-                        if hasattr(mcp_result, 'model_dump'):
-                            response_result = {"content": [mcp_result.model_dump()]}
-                        elif hasattr(mcp_result, 'to_dict'):
-                            response_result = {"content": [mcp_result.to_dict()]}
-                        else:
-                            response_result = {"content": [mcp_result]}
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "result": response_result
-                    }
-                except Exception as e:
-                    logger.error(f"工具调用失败: {e}")
-                    return self._create_error_response(
-                        request_id, -32603, "Internal error", f"工具调用失败: {str(e)}"
-                    )
-            
-            else:
+            logger.debug("处理MCP请求: %s, ID: %s", method, request_id)
+
+            handler = self._mcp_handlers.get(method)
+            if handler is None:
                 # 其他方法暂不支持
                 logger.warning(f"不支持的MCP方法: {method}")
                 return self._create_error_response(
                     request_id, -32601, "Method not found", f"不支持的方法: {method}"
                 )
+            return await handler(request_id, params)
                 
         except Exception as e:
             logger.error(f"处理MCP请求时发生错误: {e}")
             return self._create_error_response(
-                message_data.get("id"), -32603, "Internal error", str(e)
+                request_id, -32603, "Internal error", str(e)
+            )
+
+    async def _mcp_initialize(self, request_id, params: dict) -> orjson.Fragment:
+        """MCP协议初始化响应 - 符合标准格式"""
+        logger.debug("处理MCP初始化请求")
+        return _result_envelope(request_id, _INIT_RESULT)
+
+    async def _mcp_initialized(self, request_id, params: dict) -> None:
+        """初始化完成通知，不需要返回响应"""
+        logger.debug("收到MCP初始化完成通知，不返回响应")
+        return None
+
+    async def _mcp_tools_list(self, request_id, params: dict) -> orjson.Fragment:
+        """获取工具列表 - 返回标准MCP工具格式"""
+        logger.debug("开始获取工具列表...")
+        try:
+            # 始终经由_list_tools()获取列表，保证on_list_tools中间件与启用过滤照常执行
+            tools = await self.mcp_server._list_tools()
+            logger.debug("获取到 %d 个工具", len(tools))
+
+            # 快照只包含参与序列化的字段；parameters按当前内容序列化后比较，
+            # 原地修改工具的参数定义同样会使缓存失效
+            snapshot = [
+                (
+                    tool.name,
+                    tool.description,
+                    orjson.dumps(tool.parameters) if tool.parameters else None,
+                )
+                for tool in tools
+            ]
+            cache = self._tools_list_cache
+            if cache is None or cache[0] != snapshot:
+                # 转换为标准MCP工具格式，参数定义直接复用快照中的序列化结果
+                mcp_tools = [
+                    {
+                        "name": name,
+                        "description": description or f"工具: {name}",
+                        "inputSchema": (
+                            orjson.Fragment(parameters) if parameters else _DEFAULT_INPUT_SCHEMA
+                        ),
+                    }
+                    for name, description, parameters in snapshot
+                ]
+
+                # 工具未变化时复用序列化结果，之后直接拼接进响应
+                cache = (snapshot, orjson.dumps({"tools": mcp_tools}))
+                self._tools_list_cache = cache
+            
+            return _result_envelope(request_id, cache[1])
+        except Exception as e:
+            logger.error(f"获取工具列表失败: {e}")
+            return self._create_error_response(
+                request_id, -32603, "Internal error", f"获取工具列表失败: {str(e)}"
+            )
+
+    async def _mcp_tools_call(self, request_id, params: dict) -> orjson.Fragment:
+        """调用工具 - 支持标准MCP参数格式"""
+        tool_name = params.get("name")
+        arguments = params.get("arguments", {})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("工具名称: %s, 参数: %s", tool_name, arguments)
+        
+        if not tool_name:
+            return self._create_error_response(
+                request_id, -32602, "Invalid params", "Missing tool name"
+            )
+        
+        try:
+            # 每次调用使用独立的上下文，Context持有请求级状态与待发通知，不可复用
+            async with Context(self.mcp_server):
+                result = await self.mcp_server._call_tool(tool_name, arguments)
+                mcp_result = result.to_mcp_result()
+            
+            # 处理MCP结果格式 - 符合标准
+            # ContentBlock对象在序列化时由_mcp_default转换，无需逐项预处理
+            if isinstance(mcp_result, tuple):
+                content, structured_content = mcp_result
+            else:
+                content, structured_content = mcp_result, None
+            if not isinstance(content, list):
+                content = [content]
+
+            response_result = {"content": content}
+            if structured_content:
+                response_result["structuredContent"] = structured_content
+            
+            return _result_envelope(
+                request_id, orjson.dumps(
+                    response_result, default=_mcp_default, option=_DUMPS_OPTIONS
+                )
+            )
+        except Exception as e:
+            logger.error(f"工具调用失败: {e}")
+            return self._create_error_response(
+                request_id, -32603, "Internal error", f"工具调用失败: {str(e)}"
             )
     
-    def _create_error_response(self, request_id: any, code: int, message: str, data: str = None) -> dict:
-        """创建标准JSON-RPC错误响应"""
-        error_response = {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "error": {
-                "code": code,
-                "message": message
-            }
-        }
+    def _create_error_response(
+        self, request_id: any, code: int, message: str, data: str = None
+    ) -> orjson.Fragment:
+        """创建标准JSON-RPC错误响应（由预编码片段拼接，返回orjson.Fragment）"""
+        head = _ERROR_HEADS.get((code, message))
+        if head is None:
+            head = b',"error":{"code":' + orjson.dumps(code) + b',"message":' + orjson.dumps(message)
+        parts = [_ENV_PREFIX, orjson.dumps(request_id), head]
         if data:
-            error_response["error"]["data"] = data
-        return error_response
+            parts.append(_ERR_DATA)
+            parts.append(orjson.dumps(data))
+        parts.append(_ERR_END)
+        return orjson.Fragment(b"".join(parts))
 
 
 # 全局WebSocket处理器实例
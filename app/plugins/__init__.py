@@ -1,6 +1,21 @@
 """Plugins package for FastMCP API service framework."""
 
-from .weather import weather_plugin
-from .time import time_plugin
+import importlib
 
 __all__ = ["weather_plugin", "time_plugin"]
+
+# Plugin instances are created on first access (PEP 562), so importing
+# plugins.base or a single plugin does not instantiate every plugin.
+_LAZY_PLUGINS = {
+    "weather_plugin": ".weather",
+    "time_plugin": ".time",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_PLUGINS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    plugin = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = plugin
+    return plugin
@@ -4,6 +4,8 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Callable, Union, Optional
 
+from utils.jsonrpc import JSONRPCProtocol
+
 logger = logging.getLogger(__name__)
 
 
@@ -71,7 +73,6 @@ class BasePlugin(ABC):
         Returns:
             Dictionary with JSON-RPC 2.0 success response format.
         """
-        from utils.jsonrpc import JSONRPCProtocol
         response = JSONRPCProtocol.create_success_response(data, request_id)
         return JSONRPCProtocol.to_dict(response)
 
@@ -88,7 +89,6 @@ class BasePlugin(ABC):
         Returns:
             Dictionary with JSON-RPC 2.0 error response format.
         """
-        from utils.jsonrpc import JSONRPCProtocol
         response = JSONRPCProtocol.create_error_response(
             error_code, error_message, error_data, request_id
         )
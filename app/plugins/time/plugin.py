@@ -1,26 +1,199 @@
 """Time plugin for FastMCP API service framework."""
 
 import asyncio
+import time
 import httpx
-from datetime import datetime, timezone
-from typing import Dict, Any, List, Optional
+import orjson
+from datetime import datetime, timezone, tzinfo
+from typing import Dict, Any, List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
 from fastmcp.contrib.mcp_mixin import MCPMixin, mcp_tool
+from utils.http_client import shared_client
+
+# Headers and timeout sent with every WorldTimeAPI request on the shared client
+TIME_HTTP_HEADERS = {
+    "User-Agent": "FastMCP-Time-Plugin/1.0",
+    "Accept": "application/json"
+}
+TIME_HTTP_TIMEOUT = 5.0
+
+# WorldTimeAPI responses have one-second resolution, so reuse them for this long (seconds)
+TIME_CACHE_TTL = 1.0
+
+
+# Zones loaded at plugin initialization so their first lookup never touches disk
+PRELOAD_TIMEZONES = (
+    "Asia/Shanghai",
+    "America/New_York",
+    "Europe/London",
+    "Asia/Tokyo",
+    "Australia/Sydney",
+)
+
+# Resolved tzinfo objects keyed by the name as given; only valid names are stored
+_TZ_CACHE: Dict[str, tzinfo] = {}
+
+
+def _get_tz(name: str) -> tzinfo:
+    """Resolve a timezone name to a tzinfo object, caching the result.
+
+    A cache miss may read the tzdata file from disk; coroutines should use
+    ``_get_tz_async`` instead.
+
+    Args:
+        name: Timezone name (e.g., 'Asia/Shanghai', 'UTC')
+
+    Returns:
+        The matching tzinfo; ``timezone.utc`` for any casing of 'UTC'
+    """
+    tz = _TZ_CACHE.get(name)
+    if tz is None:
+        tz = timezone.utc if name.upper() == "UTC" else ZoneInfo(name)
+        _TZ_CACHE[name] = tz
+    return tz
+
+
+async def _get_tz_async(name: str) -> tzinfo:
+    """Resolve a timezone name without blocking the event loop.
+
+    Cached zones are returned directly; cold lookups run in a worker thread.
+
+    Args:
+        name: Timezone name (e.g., 'Asia/Shanghai', 'UTC')
+
+    Returns:
+        The matching tzinfo
+    """
+    tz = _TZ_CACHE.get(name)
+    if tz is None:
+        tz = await asyncio.to_thread(_get_tz, name)
+    return tz
+
+
+def _format_utc_offset(dt: datetime) -> str:
+    """Format the UTC offset of an aware datetime as '±HH:MM'.
+
+    Args:
+        dt: A timezone-aware datetime
+
+    Returns:
+        The offset string, e.g. '+08:00' or '-05:00'
+    """
+    minutes = int(dt.utcoffset().total_seconds()) // 60
+    sign = "+" if minutes >= 0 else "-"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def _local_time_info(timezone_name: str, tz: tzinfo) -> Dict[str, Any]:
+    """Build time information for a timezone from the local system clock.
+
+    Args:
+        timezone_name: Timezone name as requested by the caller
+        tz: The resolved tzinfo for timezone_name
+
+    Returns:
+        Dict containing time information, with the same fields as the WorldTimeAPI path
+    """
+    now = datetime.now(tz)
+    return {
+        "timezone": timezone_name,
+        "current_time": now.isoformat(sep=" ", timespec="seconds")[:19],
+        "iso_format": now.isoformat(),
+        "timestamp": int(now.timestamp()),
+        "utc_offset": _format_utc_offset(now),
+        # WorldTimeAPI numbering: 0 = Sunday ... 6 = Saturday
+        "day_of_week": now.isoweekday() % 7,
+        "day_of_year": now.timetuple().tm_yday,
+        "week_number": now.isocalendar()[1],
+    }
 
 
 class TimePlugin(MCPMixin):
     """Time plugin that provides real-time time querying functionality."""
     
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """Initialize the plugin.
+        
+        Args:
+            client: HTTP client to use; defaults to the process-wide shared client.
+                An injected client is owned by the caller, which must close it.
+        """
         super().__init__()
         self.name = "time"
         self.description = "Real-time time querying plugin"
         self.version = "1.0.0"
+        
+        # Pooled HTTP client shared with the other plugins
+        self.http_client = client or shared_client
+        
+        # WorldTimeAPI results: timezone_name -> (monotonic fetch time, result)
+        self._time_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # In-flight requests, shared by concurrent callers for the same timezone
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    async def initialize(self):
+        """Load the common timezones in worker threads before serving requests."""
+        await asyncio.gather(
+            *(asyncio.to_thread(_get_tz, name) for name in PRELOAD_TIMEZONES)
+        )
+    
+    async def get_time_local(
+        self, timezone_name: str = "UTC", verify_with_api: bool = False
+    ) -> Dict[str, Any]:
+        """Get time for a timezone from the system clock and tz database.
+        
+        The OS clock already knows the current instant, so this avoids a
+        network round-trip; WorldTimeAPI is only queried on request.
+        
+        Args:
+            timezone_name: Timezone name (e.g., 'Asia/Shanghai', 'America/New_York', 'UTC')
+            verify_with_api: Query WorldTimeAPI instead of computing locally
+        
+        Returns:
+            Dict containing time information
+        """
+        if verify_with_api:
+            return await self.fetch_time_worldtimeapi(timezone_name)
+        try:
+            result = _local_time_info(timezone_name, await _get_tz_async(timezone_name))
+            result["source"] = "local"
+            return result
+        except Exception as e:
+            return {
+                "error": f"Local time failed: {str(e)}",
+                "timezone": timezone_name
+            }
     
     async def fetch_time_worldtimeapi(self, timezone_name: str = "UTC") -> Dict[str, Any]:
         """Fetch time from WorldTimeAPI with fallback to local time.
         
+        Successful API results are reused for TIME_CACHE_TTL seconds, and
+        concurrent calls for the same timezone share a single request.
+        
+        Args:
+            timezone_name: Timezone name (e.g., 'Asia/Shanghai', 'America/New_York', 'UTC')
+        
+        Returns:
+            Dict containing time information from API or local fallback
+        """
+        cached = self._time_cache.get(timezone_name)
+        if cached is not None and time.monotonic() - cached[0] < TIME_CACHE_TTL:
+            return dict(cached[1])
+        
+        task = self._inflight.get(timezone_name)
+        if task is None:
+            task = asyncio.ensure_future(self._request_worldtimeapi(timezone_name))
+            self._inflight[timezone_name] = task
+            task.add_done_callback(lambda _: self._inflight.pop(timezone_name, None))
+        # shield() keeps one cancelled caller from cancelling the shared request
+        result = await asyncio.shield(task)
+        return dict(result)
+    
+    async def _request_worldtimeapi(self, timezone_name: str) -> Dict[str, Any]:
+        """Query WorldTimeAPI once, falling back to local time on failure.
+        
         Args:
             timezone_name: Timezone name (e.g., 'Asia/Shanghai', 'America/New_York', 'UTC')
         
@@ -32,53 +205,42 @@ class TimePlugin(MCPMixin):
         
         url = f"https://worldtimeapi.org/api/timezone/{api_timezone}"
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, timeout=5.0)
-                resp.raise_for_status()
-                data = resp.json()
-                
-                # Parse API response
-                dt_str = data.get("datetime")  # ISO format
-                unixt = data.get("unixtime")
-                utc_offset = data.get("utc_offset")
-                day_of_week = data.get("day_of_week")
-                day_of_year = data.get("day_of_year")
-                week_number = data.get("week_number")
-                
-                # Convert to datetime object for additional formatting
-                dt = datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-                
-                return {
-                    "timezone": timezone_name,
-                    "current_time": dt.strftime("%Y-%m-%d %H:%M:%S"),
-                    "iso_format": dt.isoformat(),
-                    "timestamp": unixt,
-                    "utc_offset": utc_offset,
-                    "day_of_week": day_of_week,
-                    "day_of_year": day_of_year,
-                    "week_number": week_number,
-                    "source": "WorldTimeAPI"
-                }
+            resp = await self.http_client.get(
+                url, headers=TIME_HTTP_HEADERS, timeout=TIME_HTTP_TIMEOUT
+            )
+            resp.raise_for_status()
+            data = orjson.loads(resp.content)
+            
+            # Parse API response
+            dt_str = data.get("datetime")  # ISO format
+            unixt = data.get("unixtime")
+            utc_offset = data.get("utc_offset")
+            day_of_week = data.get("day_of_week")
+            day_of_year = data.get("day_of_year")
+            week_number = data.get("week_number")
+            
+            # The API already returns an ISO 8601 string with the local offset
+            # ("YYYY-MM-DDTHH:MM:SS.ffffff+HH:MM"), so slice it instead of parsing
+            result = {
+                "timezone": timezone_name,
+                "current_time": dt_str[:10] + " " + dt_str[11:19],
+                "iso_format": dt_str,
+                "timestamp": unixt,
+                "utc_offset": utc_offset,
+                "day_of_week": day_of_week,
+                "day_of_year": day_of_year,
+                "week_number": week_number,
+                "source": "WorldTimeAPI"
+            }
+            self._time_cache[timezone_name] = (time.monotonic(), result)
+            return result
         except Exception as e:
             # Fallback to local time calculation
             try:
-                if timezone_name.upper() == "UTC":
-                    tz = timezone.utc
-                else:
-                    tz = ZoneInfo(timezone_name)
-                
-                now = datetime.now(tz)
-                return {
-                    "timezone": timezone_name,
-                    "current_time": now.strftime("%Y-%m-%d %H:%M:%S"),
-                    "iso_format": now.isoformat(),
-                    "timestamp": int(now.timestamp()),
-                    "day_of_week": now.strftime("%A"),
-                    "day_of_year": now.timetuple().tm_yday,
-                    "week_number": now.isocalendar()[1],
-                    "source": "local_fallback",
-                    "api_error": str(e)
-                }
+                result = _local_time_info(timezone_name, await _get_tz_async(timezone_name))
+                result["source"] = "local_fallback"
+                result["api_error"] = str(e)
+                return result
             except Exception as fallback_error:
                 return {
                     "error": f"Both API and local time failed: API error: {str(e)}, Local error: {str(fallback_error)}",
@@ -87,7 +249,7 @@ class TimePlugin(MCPMixin):
 
     @mcp_tool(name="获取当前时间", description="获取指定时区的当前时间")
     async def get_current_time(self, timezone_name: str = "UTC") -> Dict[str, Any]:
-        """Get current time in specified timezone using WorldTimeAPI.
+        """Get current time in specified timezone from the local clock.
         
         Args:
             timezone_name: Timezone name (e.g., 'Asia/Shanghai', 'America/New_York', 'UTC')
@@ -95,7 +257,7 @@ class TimePlugin(MCPMixin):
         Returns:
             Dict containing time information
         """
-        return await self.fetch_time_worldtimeapi(timezone_name)
+        return await self.get_time_local(timezone_name)
     
     # @mcp_tool(name="列出常用时区", description="获取常用时区列表")
     # async def list_common_timezones(self) -> Dict[str, Any]:
@@ -276,17 +438,14 @@ class TimePlugin(MCPMixin):
     #         ]
         
     #     world_times = {}
+    #     # Read the clock once and project the same instant into each zone
+    #     now_utc = datetime.now(timezone.utc)
         
     #     for tz_name in timezones:
     #         try:
-    #             if tz_name.upper() == "UTC":
-    #                 tz = timezone.utc
-    #             else:
-    #                 tz = pytz.timezone(tz_name)
-                
-    #             now = datetime.now(tz)
+    #             now = now_utc.astimezone(_get_tz(tz_name))
     #             world_times[tz_name] = {
-    #                 "time": now.strftime("%Y-%m-%d %H:%M:%S"),
+    #                 "time": now.isoformat(sep=" ", timespec="seconds")[:19],
     #                 "iso": now.isoformat(),
     #                 "day_of_week": now.strftime("%A")
     #             }
@@ -295,6 +454,6 @@ class TimePlugin(MCPMixin):
         
     #     return {
     #         "world_clock": world_times,
-    #         "query_time_utc": datetime.now(timezone.utc).isoformat(),
+    #         "query_time_utc": now_utc.isoformat(),
     #         "total_timezones": len(timezones)
     #     }
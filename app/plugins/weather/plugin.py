@@ -3,16 +3,32 @@
 import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Dict, List, Callable, Tuple
+from typing import Any, Dict, List, Callable, Optional, Tuple
 import httpx
+import orjson
 from pydantic import BaseModel, Field
 
 from plugins.base import BasePlugin
+from utils.http_client import shared_client
 from fastmcp.contrib.mcp_mixin import mcp_tool, MCPMixin
 
 logger = logging.getLogger(__name__)
 
+# Headers and timeout sent with every OpenWeatherMap request on the shared client
+WEATHER_HTTP_HEADERS = {
+    "User-Agent": "FastMCP-Weather-Plugin/1.0",
+    "Accept": "application/json"
+}
+WEATHER_HTTP_TIMEOUT = 30.0
+
+# OpenWeatherMap refreshes observations roughly every 10 minutes, so reuse them for this long (seconds)
+WEATHER_CACHE_TTL = 300.0
+# City names come straight from callers, so bound the number of cached entries
+WEATHER_CACHE_MAX_SIZE = 256
+
 
 class WeatherRequest(BaseModel):
     """Pydantic model for weather request validation."""
@@ -22,19 +38,25 @@ class WeatherRequest(BaseModel):
 class WeatherPlugin(BasePlugin, MCPMixin):
     """Weather plugin that provides weather information for cities."""
 
-    def __init__(self):
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        """Initialize the plugin.
+        
+        Args:
+            client: HTTP client to use; defaults to the process-wide shared client.
+                An injected client is owned by the caller, which must close it.
+        """
         super().__init__("weather")
         self.weather_api_base = os.getenv("WEATHER_API_BASE", "https://api.openweathermap.org/data/2.5")
         self.weather_api_key = os.getenv("WEATHER_API_KEY", "cbca4319f933ed0c631bcd4ac7907f37")
         
-        # HTTP client with proper headers
-        self.http_client = httpx.AsyncClient(
-            headers={
-                "User-Agent": "FastMCP-Weather-Plugin/1.0",
-                "Accept": "application/json"
-            },
-            timeout=30.0
-        )
+        # Pooled HTTP client shared with the other plugins
+        self.http_client = client or shared_client
+
+        # Weather data: normalized city name -> (monotonic fetch time, data)
+        # Kept in fetch-time order, so expired and overflow entries are evicted from the front
+        self._weather_cache: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        # In-flight requests, shared by concurrent callers for the same city
+        self._inflight: Dict[str, asyncio.Task] = {}
 
     def tools(self) -> List[Callable]:
         """Return the list of weather-related tools."""
@@ -63,25 +85,31 @@ class WeatherPlugin(BasePlugin, MCPMixin):
                     {"city": city, "error_type": "weather_api_failed"}
                 )
             
-            # Format response based on OpenWeatherMap API structure
+            # Format response based on OpenWeatherMap API structure;
+            # look up each nested section once instead of per field
+            coord = weather_data.get("coord") or {}
+            main = weather_data.get("main") or {}
+            wind = weather_data.get("wind") or {}
+            sys_info = weather_data.get("sys") or {}
+            weather = (weather_data.get("weather") or [{}])[0]
             result = {
                 "city": weather_data.get("name", city),
-                "lat": weather_data.get("coord", {}).get("lat"),
-                "lon": weather_data.get("coord", {}).get("lon"),
-                "temperature_c": weather_data.get("main", {}).get("temp", 0),
-                "feels_like": weather_data.get("main", {}).get("feels_like", 0),
-                "humidity": weather_data.get("main", {}).get("humidity", 0),
-                "pressure": weather_data.get("main", {}).get("pressure", 0),
-                "windspeed": weather_data.get("wind", {}).get("speed", 0),
-                "wind_direction": weather_data.get("wind", {}).get("deg", 0),
-                "weather_main": weather_data.get("weather", [{}])[0].get("main", ""),
-                "weather_description": weather_data.get("weather", [{}])[0].get("description", ""),
-                "weather_icon": weather_data.get("weather", [{}])[0].get("icon", ""),
+                "lat": coord.get("lat"),
+                "lon": coord.get("lon"),
+                "temperature_c": main.get("temp", 0),
+                "feels_like": main.get("feels_like", 0),
+                "humidity": main.get("humidity", 0),
+                "pressure": main.get("pressure", 0),
+                "windspeed": wind.get("speed", 0),
+                "wind_direction": wind.get("deg", 0),
+                "weather_main": weather.get("main", ""),
+                "weather_description": weather.get("description", ""),
+                "weather_icon": weather.get("icon", ""),
                 "visibility": weather_data.get("visibility", 0),
-                "clouds": weather_data.get("clouds", {}).get("all", 0),
-                "country": weather_data.get("sys", {}).get("country", ""),
-                "sunrise": weather_data.get("sys", {}).get("sunrise", 0),
-                "sunset": weather_data.get("sys", {}).get("sunset", 0),
+                "clouds": (weather_data.get("clouds") or {}).get("all", 0),
+                "country": sys_info.get("country", ""),
+                "sunrise": sys_info.get("sunrise", 0),
+                "sunset": sys_info.get("sunset", 0),
                 "observed_at": datetime.fromtimestamp(weather_data.get("dt", 0)).isoformat(),
                 "provider": "openweathermap"
             }
@@ -99,7 +127,54 @@ class WeatherPlugin(BasePlugin, MCPMixin):
 
 
     async def _get_weather_data(self, city: str) -> Dict[str, Any]:
-        """Get weather data for given city using OpenWeatherMap API.
+        """Get weather data for given city, reusing recent results.
+        
+        Successful responses are cached for WEATHER_CACHE_TTL seconds, and
+        concurrent calls for the same city share a single request.
+        
+        Args:
+            city: Name of the city.
+            
+        Returns:
+            Dictionary containing weather data or None if failed.
+        """
+        key = city.strip().lower()
+        cached = self._weather_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < WEATHER_CACHE_TTL:
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_weather_data(city))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield() keeps one cancelled caller from cancelling the shared request
+        data = await asyncio.shield(task)
+        if data is not None:
+            self._store_weather(key, data)
+        else:
+            self._weather_cache.pop(key, None)
+        return data
+
+    def _store_weather(self, key: str, data: Dict[str, Any]):
+        """Cache weather data, evicting expired entries and the oldest beyond the size cap.
+        
+        Args:
+            key: Normalized city name.
+            data: Weather data returned by the API.
+        """
+        now = time.monotonic()
+        cache = self._weather_cache
+        cache[key] = (now, data)
+        cache.move_to_end(key)
+        while cache:
+            oldest_key, (fetched_at, _) = next(iter(cache.items()))
+            if len(cache) <= WEATHER_CACHE_MAX_SIZE and now - fetched_at < WEATHER_CACHE_TTL:
+                break
+            del cache[oldest_key]
+
+    async def _fetch_weather_data(self, city: str) -> Dict[str, Any]:
+        """Fetch weather data for given city from the OpenWeatherMap API.
         
         Args:
             city: Name of the city.
@@ -117,10 +192,12 @@ class WeatherPlugin(BasePlugin, MCPMixin):
                 "lang": "zh_cn"
             }
             
-            response = await self.http_client.get(url, params=params)
+            response = await self.http_client.get(
+                url, params=params, headers=WEATHER_HTTP_HEADERS, timeout=WEATHER_HTTP_TIMEOUT
+            )
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Check if the response indicates an error
             if data.get("cod") != 200:
@@ -136,8 +213,3 @@ class WeatherPlugin(BasePlugin, MCPMixin):
         except Exception as e:
             logger.error(f"Unexpected error during weather data fetch for {city}: {str(e)}")
             return None
-
-
-    async def close(self):
-        """Close the HTTP client."""
-        await self.http_client.aclose()
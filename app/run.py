@@ -5,7 +5,6 @@ import asyncio
 import logging
 import os
 import sys
-import json
 import signal
 from typing import Any, Dict
 from contextlib import asynccontextmanager
@@ -15,6 +14,7 @@ from fastmcp import FastMCP
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
+import orjson
 
 # Try to import uvloop for better performance
 try:
@@ -23,10 +23,14 @@ try:
 except ImportError:
     UVLOOP_AVAILABLE = False
 
-from plugins import weather_plugin, time_plugin
+# Event loop implementation handed to uvicorn; "auto" falls back to asyncio
+UVICORN_LOOP = "uvloop" if UVLOOP_AVAILABLE and sys.platform != "win32" else "auto"
+
+from plugins import weather_plugin
 from core.connection_manager import connection_manager
-from handlers.websocket_handler import websocket_handler
+from handlers.websocket_handler import websocket_handler, dumps_message
 from utils.jsonrpc import JSONRPCProtocol
+from utils.http_client import close_shared_client
 
 # Load environment variables
 load_dotenv()
@@ -69,7 +73,8 @@ class FastMCPAPIServer:
         # Register weather plugin
         await self._register_plugin(weather_plugin)
         
-        # Register time plugin
+        # Register time plugin (import time_plugin from plugins when enabling;
+        # plugins are created lazily, so an unused import would still build it)
         # await self._register_plugin(time_plugin)
         
         logger.info(f"Registered {len(self.plugins)} plugins")
@@ -240,7 +245,7 @@ class FastMCPAPIServer:
         
         # Start the server
         import uvicorn
-        uvicorn.run(app, host=self.host, port=self.port)
+        uvicorn.run(app, host=self.host, port=self.port, loop=UVICORN_LOOP)
 
     def run_dual_transport(self):
         """Run the server with both SSE and WebSocket transport."""
@@ -272,7 +277,7 @@ class FastMCPAPIServer:
         
         # Start the server with uvicorn
         import uvicorn
-        uvicorn.run(sse_app, host=self.host, port=self.port)
+        uvicorn.run(sse_app, host=self.host, port=self.port, loop=UVICORN_LOOP)
     
     async def health_check_endpoint(self, request):
         """Health check endpoint for dual transport."""
@@ -299,6 +304,11 @@ class FastMCPAPIServer:
                 except Exception as e:
                     logger.error(f"Error closing plugin {plugin.name}: {str(e)}")
         
+        try:
+            await close_shared_client()
+        except Exception as e:
+            logger.error(f"Error closing shared HTTP client: {str(e)}")
+        
         logger.info("Server cleanup completed")
 
     async def validate_token_and_get_agent_id(self, websocket: WebSocket) -> str:
@@ -348,29 +358,31 @@ class FastMCPAPIServer:
             return
 
         try:
-            # 注册连接
-            await connection_manager.register_tool_connection(agent_id, websocket)
+            # 注册连接，batch=1时启用NDJSON批量转发，binary=1时以二进制帧发送
+            batch = websocket.query_params.get("batch", "").lower() in ("1", "true")
+            binary = websocket.query_params.get("binary", "").lower() in ("1", "true")
+            await connection_manager.register_tool_connection(
+                agent_id, websocket, batch=batch, binary=binary
+            )
             logger.info(f"工具端连接已建立: {agent_id}")
 
             # 处理消息
             while True:
                 try:
                     message = await websocket.receive_text()
-                    logger.info(f"工具端收到原始消息: {message}")
+                    logger.debug("工具端收到原始消息: %s", message)
                     await websocket_handler._handle_tool_message(agent_id, message, websocket)
                 except WebSocketDisconnect:
                     logger.info("🔌 WebSocket连接断开")
                     break
                 except Exception as e:
-                    logger.error(f"处理工具端消息时发生错误: {e}")
-                    import traceback
-                    logger.error(f"异常详情: {traceback.format_exc()}")
+                    logger.exception("处理工具端消息时发生错误: %s", e)
                     break
 
         except Exception as e:
             logger.error(f"处理工具端连接时发生错误: {e}")
         finally:
-            await connection_manager.unregister_tool_connection(agent_id)
+            await connection_manager.unregister_tool_connection(agent_id, websocket)
             logger.info(f"工具端连接已关闭: {agent_id}")
 
     async def websocket_robot_endpoint(self, websocket: WebSocket):
@@ -383,18 +395,18 @@ class FastMCPAPIServer:
             return
 
         try:
-            # 注册连接并获取UUID
-            connection_uuid = await connection_manager.register_robot_connection(
+            # 注册连接并获取连接ID
+            connection_id = await connection_manager.register_robot_connection(
                 agent_id, websocket
             )
-            logger.info(f"小智端连接已建立: {agent_id} (UUID: {connection_uuid})")
+            logger.info(f"小智端连接已建立: {agent_id} (ID: {connection_id})")
 
             # 处理消息
             while True:
                 try:
                     message = await websocket.receive_text()
                     await websocket_handler._handle_robot_message(
-                        agent_id, message, connection_uuid, websocket
+                        agent_id, message, connection_id, websocket
                     )
                 except WebSocketDisconnect:
                     break
@@ -405,8 +417,8 @@ class FastMCPAPIServer:
         except Exception as e:
             logger.error(f"处理小智端连接时发生错误: {e}")
         finally:
-            await connection_manager.unregister_robot_connection(connection_uuid)
-            logger.info(f"小智端连接已关闭: {agent_id} (UUID: {connection_uuid})")
+            await connection_manager.unregister_robot_connection(connection_id)
+            logger.info(f"小智端连接已关闭: {agent_id} (ID: {connection_id})")
 
     async def websocket_mcp_protocol_endpoint(self, websocket: WebSocket):
         """MCP协议WebSocket端点 - 符合MCP 2024-11-05协议标准"""
@@ -423,12 +435,12 @@ class FastMCPAPIServer:
                         websocket.receive_text(), 
                         timeout=10.0
                     )
-                    logger.info(f"收到MCP协议消息: {message}")
+                    logger.debug("收到MCP协议消息: %s", message)
                     
                     # 解析JSON-RPC消息
                     try:
-                        message_data = json.loads(message)
-                    except json.JSONDecodeError as e:
+                        message_data = orjson.loads(message)
+                    except orjson.JSONDecodeError as e:
                         logger.error(f"MCP协议消息JSON解析失败: {e}")
                         error_response = {
                             "jsonrpc": "2.0",
@@ -438,36 +450,19 @@ class FastMCPAPIServer:
                                 "message": "Parse error"
                             }
                         }
-                        await websocket.send_text(json.dumps(error_response))
+                        await websocket.send_text(dumps_message(error_response))
                         continue
                     
-                    # 处理MCP请求，设置10秒超时
-                    try:
-                        response = await asyncio.wait_for(
-                            websocket_handler._handle_mcp_request(message_data),
-                            timeout=10.0
-                        )
-                        
-                        # 发送响应（如果有的话）
-                        if response is not None:
-                            logger.info(f"发送MCP协议响应: {json.dumps(response, ensure_ascii=False)}")
-                            await websocket.send_text(json.dumps(response, ensure_ascii=False))
-                        else:
-                            logger.info("MCP协议请求不需要响应（通知类型）")
-                            
-                    except asyncio.TimeoutError:
-                        logger.error("MCP请求处理超时（10秒）")
-                        # 发送超时错误响应
-                        timeout_response = {
-                            "jsonrpc": "2.0",
-                            "id": message_data.get("id"),
-                            "error": {
-                                "code": -32603,
-                                "message": "Internal error",
-                                "data": {"detail": "Request timeout after 10 seconds"}
-                            }
-                        }
-                        await websocket.send_text(json.dumps(timeout_response, ensure_ascii=False))
+                    # 处理MCP请求，设置10秒超时，超时时返回超时错误响应
+                    response = await websocket_handler._run_mcp_request(message_data)
+
+                    # 发送响应（如果有的话）
+                    if response is not None:
+                        response_text = dumps_message(response)
+                        logger.debug("发送MCP协议响应: %s", response_text)
+                        await websocket.send_text(response_text)
+                    else:
+                        logger.debug("MCP协议请求不需要响应（通知类型）")
                         
                 except asyncio.TimeoutError:
                     logger.warning("WebSocket消息接收超时（10秒），保持连接")
@@ -487,7 +482,7 @@ class FastMCPAPIServer:
                             "data": {"detail": str(e)}
                         }
                     }
-                    await websocket.send_text(json.dumps(error_response))
+                    await websocket.send_text(dumps_message(error_response))
                     
         except Exception as e:
             logger.error(f"处理MCP协议连接时发生错误: {e}")
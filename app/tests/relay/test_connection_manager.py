@@ -0,0 +1,121 @@
+import asyncio
+
+from core.connection_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent: list[str] = []
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(0.001)
+        if self.fail:
+            raise RuntimeError("send failed")
+        self.sent.append(message)
+
+    async def close(self):
+        pass
+
+
+class TestBatchedToolWriter:
+    async def test_concurrent_forwards_are_coalesced(self):
+        manager = ConnectionManager()
+        websocket = FakeWebSocket()
+        await manager.register_tool_connection("agent", websocket, batch=True)
+
+        results = await asyncio.gather(
+            *(manager.forward_to_tool("agent", f"m{i}") for i in range(20))
+        )
+
+        assert all(results)
+        lines = [line for frame in websocket.sent for line in frame.split("\n")]
+        assert lines == [f"m{i}" for i in range(20)]
+        assert len(websocket.sent) < 20
+        await manager.unregister_tool_connection("agent")
+
+    async def test_send_failure_is_reported_for_every_queued_message(self):
+        manager = ConnectionManager()
+        await manager.register_tool_connection("agent", FakeWebSocket(fail=True), batch=True)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*(manager.forward_to_tool("agent", f"m{i}") for i in range(40))),
+            timeout=1,
+        )
+
+        assert results == [False] * 40
+        assert "agent" not in manager.tool_writers
+
+    async def test_unregister_fails_pending_forwards(self):
+        manager = ConnectionManager()
+        await manager.register_tool_connection("agent", FakeWebSocket(), batch=True)
+
+        pending = [
+            asyncio.ensure_future(manager.forward_to_tool("agent", f"m{i}")) for i in range(5)
+        ]
+        await asyncio.sleep(0)
+        await manager.unregister_tool_connection("agent")
+
+        assert await asyncio.wait_for(asyncio.gather(*pending), timeout=1) == [False] * 5
+
+
+class SlowCloseWebSocket(FakeWebSocket):
+    async def close(self):
+        await asyncio.sleep(0.5)
+
+
+class TestRegistration:
+    async def test_slow_close_of_replaced_tool_does_not_block_registration(self):
+        manager = ConnectionManager()
+        await manager.register_tool_connection("agent", SlowCloseWebSocket())
+
+        replacing = asyncio.ensure_future(
+            manager.register_tool_connection("agent", FakeWebSocket())
+        )
+        await asyncio.sleep(0)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        connection_id = await manager.register_robot_connection("agent", FakeWebSocket())
+
+        assert connection_id
+        assert loop.time() - started < 0.1
+        assert await replacing
+
+
+class TestPatchJsonrpcId:
+    def setup_method(self):
+        self.manager = ConnectionManager()
+
+    def test_rewrites_numeric_id(self):
+        raw = '{"jsonrpc":"2.0","id":1,"method":"custom/do"}'
+        assert (
+            self.manager.patch_jsonrpc_id(raw, 1, "7:1")
+            == '{"jsonrpc":"2.0","id":"7:1","method":"custom/do"}'
+        )
+
+    def test_rewrites_string_id_with_whitespace_around_colon(self):
+        raw = '{"jsonrpc": "2.0", "id" :  "abc", "method": "custom/do"}'
+        assert (
+            self.manager.patch_jsonrpc_id(raw, "abc", "7:abc")
+            == '{"jsonrpc": "2.0", "id" :  "7:abc", "method": "custom/do"}'
+        )
+
+    def test_nested_id_falls_back(self):
+        raw = '{"jsonrpc":"2.0","id":1,"method":"custom/do","params":{"id":1}}'
+        assert self.manager.patch_jsonrpc_id(raw, 1, "7:1") is None
+
+    def test_id_inside_string_value_falls_back(self):
+        raw = '{"jsonrpc":"2.0","id":1,"method":"custom/do","params":{"field":"id"}}'
+        assert self.manager.patch_jsonrpc_id(raw, 1, "7:1") is None
+
+    def test_mismatched_id_falls_back(self):
+        raw = '{"jsonrpc":"2.0","id":2,"method":"custom/do"}'
+        assert self.manager.patch_jsonrpc_id(raw, 1, "7:1") is None
+
+    def test_numeric_and_string_ids_are_not_interchangeable(self):
+        assert self.manager.patch_jsonrpc_id('{"id":"1","method":"m"}', 1, "7:1") is None
+        assert self.manager.patch_jsonrpc_id('{"id":1,"method":"m"}', "1", "7:1") is None
+
+    def test_missing_id_falls_back(self):
+        assert self.manager.patch_jsonrpc_id('{"jsonrpc":"2.0","method":"m"}', 1, "7:1") is None
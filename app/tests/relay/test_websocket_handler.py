@@ -0,0 +1,257 @@
+import asyncio
+
+import orjson
+
+from fastmcp import FastMCP
+from fastmcp.server.middleware import Middleware
+from handlers.websocket_handler import WebSocketHandler
+
+
+def _tool_names(response) -> list[str]:
+    return [tool["name"] for tool in orjson.loads(orjson.dumps(response))["result"]["tools"]]
+
+
+class TestToolsListCache:
+    async def test_reuses_serialized_result_when_tools_unchanged(self):
+        mcp = FastMCP()
+
+        @mcp.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        handler = WebSocketHandler(mcp)
+        await handler._mcp_tools_list(1, {})
+        cached = handler._tools_list_cache
+        response = await handler._mcp_tools_list(2, {})
+
+        assert handler._tools_list_cache is cached
+        assert _tool_names(response) == ["add"]
+        assert orjson.loads(orjson.dumps(response))["id"] == 2
+
+    async def test_added_tool_is_listed(self):
+        mcp = FastMCP()
+
+        @mcp.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        handler = WebSocketHandler(mcp)
+        await handler._mcp_tools_list(1, {})
+
+        @mcp.tool
+        def sub(a: int, b: int) -> int:
+            return a - b
+
+        response = await handler._mcp_tools_list(2, {})
+        assert sorted(_tool_names(response)) == ["add", "sub"]
+
+    async def test_disabled_tool_is_not_listed(self):
+        mcp = FastMCP()
+
+        @mcp.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        handler = WebSocketHandler(mcp)
+        assert _tool_names(await handler._mcp_tools_list(1, {})) == ["add"]
+
+        add.disable()
+        assert _tool_names(await handler._mcp_tools_list(2, {})) == []
+
+        add.enable()
+        assert _tool_names(await handler._mcp_tools_list(3, {})) == ["add"]
+
+    async def test_mounted_server_tools_are_listed(self):
+        mcp = FastMCP()
+        handler = WebSocketHandler(mcp)
+        assert _tool_names(await handler._mcp_tools_list(1, {})) == []
+
+        sub = FastMCP()
+
+        @sub.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        mcp.mount(sub, prefix="sub")
+        assert len(_tool_names(await handler._mcp_tools_list(2, {}))) == 1
+
+    async def test_list_tools_middleware_runs_on_every_request(self):
+        calls = []
+
+        class RecordingMiddleware(Middleware):
+            async def on_list_tools(self, context, call_next):
+                calls.append(context.method)
+                return await call_next(context)
+
+        mcp = FastMCP()
+
+        @mcp.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        mcp.add_middleware(RecordingMiddleware())
+        handler = WebSocketHandler(mcp)
+        await handler._mcp_tools_list(1, {})
+        await handler._mcp_tools_list(2, {})
+
+        assert len(calls) == 2
+
+
+class BinaryToolWebSocket:
+    def __init__(self):
+        self.text: list[str] = []
+        self.binary: list[bytes] = []
+
+    async def send_text(self, message: str):
+        self.text.append(message)
+
+    async def send_bytes(self, message: bytes):
+        self.binary.append(message)
+
+    async def close(self):
+        pass
+
+
+class TestToolMcpReplies:
+    async def test_reply_to_binary_tool_uses_binary_frame(self):
+        from core.connection_manager import connection_manager
+
+        handler = WebSocketHandler(FastMCP())
+        websocket = BinaryToolWebSocket()
+        await connection_manager.register_tool_connection("binary-agent", websocket, binary=True)
+        try:
+            await handler._handle_tool_message(
+                "binary-agent",
+                '{"jsonrpc":"2.0","id":1,"method":"initialize","params":{}}',
+                websocket,
+            )
+        finally:
+            await connection_manager.unregister_tool_connection("binary-agent", websocket)
+
+        assert websocket.text == []
+        assert orjson.loads(websocket.binary[0])["id"] == 1
+
+
+class TextWebSocket:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, message: str):
+        self.sent.append(message)
+
+    async def close(self):
+        pass
+
+
+class TestBatchedToolFraming:
+    async def test_pretty_printed_robot_frames_stay_one_line_per_message(self):
+        from core.connection_manager import connection_manager
+
+        handler = WebSocketHandler(FastMCP())
+        tool, robot = TextWebSocket(), TextWebSocket()
+        await connection_manager.register_tool_connection("framing-agent", tool, batch=True)
+        connection_id = await connection_manager.register_robot_connection("framing-agent", robot)
+        request = orjson.dumps(
+            {"jsonrpc": "2.0", "id": 1, "method": "custom/do", "params": {"a": 1}},
+            option=orjson.OPT_INDENT_2,
+        ).decode()
+        notification = orjson.dumps(
+            {"jsonrpc": "2.0", "method": "custom/notify", "params": {"b": 2}},
+            option=orjson.OPT_INDENT_2,
+        ).decode()
+        try:
+            await asyncio.gather(
+                handler._handle_robot_message("framing-agent", request, connection_id, robot),
+                handler._handle_robot_message("framing-agent", notification, connection_id, robot),
+            )
+        finally:
+            await connection_manager.unregister_robot_connection(connection_id)
+            await connection_manager.unregister_tool_connection("framing-agent", tool)
+
+        lines = [line for frame in tool.sent for line in frame.split("\n")]
+        messages = [orjson.loads(line) for line in lines]
+        assert sorted(m["method"] for m in messages) == ["custom/do", "custom/notify"]
+        assert robot.sent == []
+
+
+class TestToolsListCacheMutation:
+    async def test_in_place_parameter_change_is_listed(self):
+        mcp = FastMCP()
+
+        @mcp.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        handler = WebSocketHandler(mcp)
+        await handler._mcp_tools_list(1, {})
+
+        add.parameters["properties"]["a"]["description"] = "first operand"
+        response = orjson.loads(orjson.dumps(await handler._mcp_tools_list(2, {})))
+
+        schema = response["result"]["tools"][0]["inputSchema"]
+        assert schema["properties"]["a"]["description"] == "first operand"
+
+
+class TestRobotBatch:
+    async def _run(self, agent_id: str, message: str):
+        from core.connection_manager import connection_manager
+
+        mcp = FastMCP()
+
+        @mcp.tool
+        def add(a: int, b: int) -> int:
+            return a + b
+
+        handler = WebSocketHandler(mcp)
+        tool, robot = TextWebSocket(), TextWebSocket()
+        await connection_manager.register_tool_connection(agent_id, tool)
+        connection_id = await connection_manager.register_robot_connection(agent_id, robot)
+        try:
+            await handler._handle_robot_message(agent_id, message, connection_id, robot)
+        finally:
+            await connection_manager.unregister_robot_connection(connection_id)
+            await connection_manager.unregister_tool_connection(agent_id, tool)
+        return tool, robot
+
+    async def test_mixed_batch(self):
+        batch = [
+            {"jsonrpc": "2.0", "id": 1, "method": "tools/list"},
+            {"jsonrpc": "2.0", "id": 2, "method": "custom/do"},
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            5,
+        ]
+        tool, robot = await self._run("batch-mixed", orjson.dumps(batch).decode())
+
+        assert len(robot.sent) == 1
+        responses = orjson.loads(robot.sent[0])
+        assert isinstance(responses, list) and len(responses) == 2
+        assert [t["name"] for t in responses[0]["result"]["tools"]] == ["add"]
+        assert responses[1] == {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32600, "message": "Invalid Request"},
+        }
+
+        assert len(tool.sent) == 1
+        forwarded = orjson.loads(tool.sent[0])
+        assert forwarded["method"] == "custom/do"
+        assert forwarded["id"].endswith(":2")
+
+    async def test_empty_batch_is_invalid_request(self):
+        tool, robot = await self._run("batch-empty", "[]")
+
+        assert tool.sent == []
+        assert len(robot.sent) == 1
+        response = orjson.loads(robot.sent[0])
+        assert response["id"] is None
+        assert response["error"]["code"] == -32600
+
+    async def test_all_notification_batch_sends_no_reply(self):
+        batch = [
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        ]
+        tool, robot = await self._run("batch-notify", orjson.dumps(batch).decode())
+
+        assert robot.sent == []
+        assert tool.sent == []
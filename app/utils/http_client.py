@@ -0,0 +1,26 @@
+"""
+共享HTTP客户端
+所有插件复用同一个连接池，访问同一主机时可复用keep-alive连接
+"""
+
+import httpx
+
+# 连接池上限：总连接数与空闲保活连接数
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# 默认超时（秒），插件可在单次请求中覆盖
+HTTP_DEFAULT_TIMEOUT = 10.0
+
+shared_client = httpx.AsyncClient(
+    timeout=HTTP_DEFAULT_TIMEOUT,
+    limits=httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    ),
+)
+
+
+async def close_shared_client():
+    """关闭共享HTTP客户端（服务关闭时调用）"""
+    await shared_client.aclose()
@@ -5,9 +5,12 @@ JSON-RPC 2.0 协议封装类
 """
 
 import json
+from functools import lru_cache
 from typing import Any, Dict, Optional, Union
 from dataclasses import dataclass, asdict
 
+import orjson
+
 
 @dataclass
 class JSONRPCError:
@@ -100,13 +103,16 @@ class JSONRPCProtocol:
         obj: Union[JSONRPCRequest, JSONRPCResponse], ensure_ascii: bool = False
     ) -> str:
         """将对象转换为JSON字符串"""
-        return json.dumps(asdict(obj), ensure_ascii=ensure_ascii)
+        if ensure_ascii:
+            # orjson不支持转义非ASCII字符，此时回退到标准库
+            return json.dumps(asdict(obj), ensure_ascii=True)
+        return orjson.dumps(asdict(obj)).decode()
 
     @staticmethod
     def parse_request(json_str: str) -> Optional[JSONRPCRequest]:
         """解析JSON-RPC请求"""
         try:
-            data = json.loads(json_str)
+            data = orjson.loads(json_str)
             if not isinstance(data, dict):
                 return None
 
@@ -122,14 +128,14 @@ class JSONRPCProtocol:
                 id=data.get("id"),
                 jsonrpc=data["jsonrpc"],
             )
-        except (json.JSONDecodeError, KeyError, TypeError):
+        except (orjson.JSONDecodeError, KeyError, TypeError):
             return None
 
     @staticmethod
     def parse_response(json_str: str) -> Optional[JSONRPCResponse]:
         """解析JSON-RPC响应"""
         try:
-            data = json.loads(json_str)
+            data = orjson.loads(json_str)
             if not isinstance(data, dict):
                 return None
 
@@ -159,7 +165,7 @@ class JSONRPCProtocol:
                 )
 
             return response
-        except (json.JSONDecodeError, KeyError, TypeError):
+        except (orjson.JSONDecodeError, KeyError, TypeError):
             return None
 
     @staticmethod
@@ -179,42 +185,40 @@ class JSONRPCProtocol:
         return request is not None and request.id is None
 
 
+@lru_cache(maxsize=1024)
+def _error_head(error_code: int, error_message: str, agent_id: Optional[str], details: str) -> bytes:
+    """预编码错误响应中id之前的部分，仅agent_id随连接变化，按参数缓存"""
+    error_data = {"agent_id": agent_id, "details": details} if agent_id else None
+    error = {"code": error_code, "message": error_message, "data": error_data}
+    return b'{"result":null,"error":' + orjson.dumps(error) + b',"id":'
+
+
+def _build_error(head: bytes, request_id: Optional[Union[str, int]]) -> str:
+    """拼接预编码的错误响应与请求ID，字段与to_json(asdict(...))一致"""
+    return (head + orjson.dumps(request_id) + b',"jsonrpc":"2.0"}').decode()
+
+
 def create_tool_not_connected_error(
     request_id: Optional[Union[str, int]] = None, agent_id: Optional[str] = None
 ) -> str:
     """创建工具端未连接的错误消息"""
-    error_data = (
-        {"agent_id": agent_id, "details": "请求的工具端连接不存在或已断开"}
-        if agent_id
-        else None
+    head = _error_head(
+        JSONRPCProtocol.TOOL_NOT_CONNECTED,
+        "工具端未连接",
+        agent_id,
+        "请求的工具端连接不存在或已断开",
     )
-
-    response = JSONRPCProtocol.create_error_response(
-        error_code=JSONRPCProtocol.TOOL_NOT_CONNECTED,
-        error_message="工具端未连接",
-        error_data=error_data,
-        request_id=request_id,
-    )
-    return JSONRPCProtocol.to_json(response, ensure_ascii=False)
+    return _build_error(head, request_id)
 
 
 def create_forward_failed_error(
     request_id: Optional[Union[str, int]] = None, agent_id: Optional[str] = None
 ) -> str:
     """创建转发失败的错误消息"""
-    error_data = (
-        {"agent_id": agent_id, "details": "消息转发过程中发生错误"}
-        if agent_id
-        else None
-    )
-
-    response = JSONRPCProtocol.create_error_response(
-        error_code=JSONRPCProtocol.FORWARD_FAILED,
-        error_message="转发消息失败",
-        error_data=error_data,
-        request_id=request_id,
+    head = _error_head(
+        JSONRPCProtocol.FORWARD_FAILED, "转发消息失败", agent_id, "消息转发过程中发生错误"
     )
-    return JSONRPCProtocol.to_json(response, ensure_ascii=False)
+    return _build_error(head, request_id)
 
 
 def create_authentication_error(message: str = "认证失败") -> str:
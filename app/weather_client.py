@@ -4,9 +4,10 @@ import asyncio
 import json
 import logging
 import sys
+from contextlib import AsyncExitStack
 from typing import Any, Dict
 
-from fastmcp import FastMCPClient
+from fastmcp import Client
 
 # Configure logging
 logging.basicConfig(
@@ -15,37 +16,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of in-flight requests sharing one session
+MAX_CONCURRENT_REQUESTS = 16
+
 
 class WeatherClient:
     """Client for interacting with the FastMCP Weather API."""
 
-    def __init__(self, server_url: str = "http://localhost:8010/sse"):
+    def __init__(
+        self,
+        server_url: str = "http://localhost:8010/sse",
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+    ):
         """Initialize the weather client.
         
         Args:
             server_url: URL of the FastMCP server SSE endpoint.
+            max_concurrent_requests: Upper bound on concurrent requests over the session.
         """
         self.server_url = server_url
         self.client = None
+        self._stack = None
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
 
     async def connect(self):
-        """Connect to the FastMCP server."""
+        """Connect to the FastMCP server.
+
+        The session stays open until disconnect(), so all requests reuse the
+        same transport instead of reconnecting per call.
+        """
+        if self.client:
+            return
+
+        stack = AsyncExitStack()
         try:
-            self.client = FastMCPClient(self.server_url)
-            await self.client.connect()
+            self.client = await stack.enter_async_context(Client(self.server_url))
+            self._stack = stack
             logger.info(f"Connected to FastMCP server at {self.server_url}")
         except Exception as e:
+            await stack.aclose()
             logger.error(f"Failed to connect to server: {str(e)}")
             raise
 
     async def disconnect(self):
         """Disconnect from the FastMCP server."""
-        if self.client:
+        if self._stack:
             try:
-                await self.client.disconnect()
+                await self._stack.aclose()
                 logger.info("Disconnected from FastMCP server")
             except Exception as e:
                 logger.error(f"Error disconnecting from server: {str(e)}")
+            finally:
+                self._stack = None
+                self.client = None
 
     async def get_weather(self, city: str) -> Dict[str, Any]:
         """Get weather information for a city.
@@ -63,10 +86,11 @@ class WeatherClient:
             logger.info(f"Requesting weather for city: {city}")
             
             # Call the get_weather tool
-            result = await self.client.call_tool(
-                name="get_weather",
-                arguments={"city": city}
-            )
+            async with self._semaphore:
+                result = await self.client.call_tool(
+                    name="get_weather",
+                    arguments={"city": city}
+                )
             
             logger.info(f"Weather request completed for {city}")
             return result
@@ -91,7 +115,8 @@ class WeatherClient:
             raise RuntimeError("Client not connected. Call connect() first.")
         
         try:
-            tools = await self.client.list_tools()
+            async with self._semaphore:
+                tools = await self.client.list_tools()
             logger.info(f"Retrieved {len(tools)} tools from server")
             return tools
         except Exception as e:
@@ -108,7 +133,8 @@ class WeatherClient:
             raise RuntimeError("Client not connected. Call connect() first.")
         
         try:
-            resources = await self.client.list_resources()
+            async with self._semaphore:
+                resources = await self.client.list_resources()
             logger.info(f"Retrieved {len(resources)} resources from server")
             return resources
         except Exception as e:
@@ -116,9 +142,13 @@ class WeatherClient:
             return {"error": str(e)}
 
 
+# Shared client instance so callers reuse one session
+weather_client = WeatherClient()
+
+
 async def demo_weather_client():
     """Demonstrate the weather client functionality."""
-    client = WeatherClient()
+    client = weather_client
     
     try:
         # Connect to the server
@@ -183,7 +213,7 @@ async def demo_weather_client():
 
 async def interactive_mode():
     """Interactive mode for testing weather queries."""
-    client = WeatherClient()
+    client = weather_client
     
     try:
         await client.connect()
@@ -247,8 +277,7 @@ def main():
     args = parser.parse_args()
     
     # Update client server URL if provided
-    if args.server != "http://localhost:8010/sse":
-        WeatherClient.server_url = args.server
+    weather_client.server_url = args.server
     
     try:
         if args.mode == "demo":